@@ -0,0 +1,271 @@
+import argparse
+import mmap
+import os
+import random
+import re
+import struct
+import tempfile
+from collections import defaultdict
+
+from bitboard import SQUARE_INDEX, SQUARE_NAMES, unpack_move, move_name
+from chess_rules import starting_board, board_from_fen
+
+# A Polyglot book is a sorted list of 16 byte big endian entries: position key, move, weight, learn
+ENTRY = struct.Struct('>QHHI')
+# Polyglot promotion numbers, 0 means no promotion
+POLYGLOT_PROMOTIONS = {None: 0, 'knight': 1, 'bishop': 2, 'rook': 3, 'queen': 4}
+PROMOTION_NAMES = {number: name for name, number in POLYGLOT_PROMOTIONS.items()}
+# Polyglot writes castling as the king taking its own rook
+CASTLING_TO_ROOK = {(SQUARE_INDEX['e1'], SQUARE_INDEX['g1']): SQUARE_INDEX['h1'],
+                    (SQUARE_INDEX['e1'], SQUARE_INDEX['c1']): SQUARE_INDEX['a1'],
+                    (SQUARE_INDEX['e8'], SQUARE_INDEX['g8']): SQUARE_INDEX['h8'],
+                    (SQUARE_INDEX['e8'], SQUARE_INDEX['c8']): SQUARE_INDEX['a8']}
+ROOK_TO_CASTLING = {(start, rook): end for (start, end), rook in CASTLING_TO_ROOK.items()}
+SAN_PIECES = {'N': 'knight', 'B': 'bishop', 'R': 'rook', 'Q': 'queen', 'K': 'king'}
+# Book weights of a move by the result of the game, from the point of view of the side that played it
+RESULT_WEIGHTS = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1), '*': (1, 1)}
+
+# Positions are looked up by board.key, which is the Polyglot key (see ZOBRIST in bitboard.py), so books from other
+# Polyglot tools work here and the ones build_book writes work there. Keys from the Polyglot documentation, checked by --check:
+KNOWN_KEYS = [
+    ("starting position", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1", 0x463B96181691FC9C),
+    ("after e4", "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1", 0x823C9B50FD114196),
+    ("after e4 d5", "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 2", 0x0756B94461C50FB0),
+    ("after e4 d5 e5 f5", "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", 0x22A48B5A8E47FF78),
+    ("after e4 d5 e5 f5 Ke2 Kf7", "rnbq1bnr/ppp1pkpp/8/3pPp2/8/8/PPPPKPPP/RNBQ1BNR w - - 0 4", 0x00FDD303C946BDD9),
+]
+
+
+def encode_move(board, move):
+    """Our packed move as a Polyglot move number: to | from << 6 | promotion << 12 (from and to swapped)."""
+    start, end, promotion = unpack_move(move)
+    piece = board.squares[start]
+    if piece is not None and piece.type == 'king':
+        end = CASTLING_TO_ROOK.get((start, end), end)
+    return end | start << 6 | POLYGLOT_PROMOTIONS[promotion] << 12
+
+
+def decode_move(board, number):
+    start, end = number >> 6 & 63, number & 63
+    piece = board.squares[start]
+    if piece is not None and piece.type == 'king':
+        end = ROOK_TO_CASTLING.get((start, end), end)
+    return board.move_for(start, end, PROMOTION_NAMES.get(number >> 12 & 7))
+
+
+class OpeningBook:
+    """Read only Polyglot book. The file is memory mapped and binary searched, so nothing is loaded into RAM
+    and many processes reading the same book share its pages."""
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        size = self.file.seek(0, 2)
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.count = size // ENTRY.size
+
+    def close(self):
+        if self.map:
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def entries(self, key):
+        """All (move number, weight, learn) entries of a position key."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from('>Q', self.map, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        for index in range(low, self.count):
+            entry_key, move, weight, learn = ENTRY.unpack_from(self.map, index * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((move, weight, learn))
+        return found
+
+    def moves(self, board):
+        """Book moves of the position with their weights, moves that aren't legal here (hash clashes) are left out."""
+        legal = board.legal_moves()
+        moves = []
+        for number, weight, _ in self.entries(board.key):
+            move = decode_move(board, number)
+            if move in legal:
+                moves.append((move, weight))
+        return moves
+
+    def choose(self, board, rng=random):
+        """Picks a book move at random by weight, None when the position isn't in the book."""
+        moves = [(move, weight) for move, weight in self.moves(board) if weight]
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+
+def parse_san(board, san):
+    """Finds the legal move a SAN string like Nbd7, exd5, O-O or e8=Q+ stands for, raises ValueError if there is none."""
+    san = san.rstrip('+#!?')
+    legal = board.legal_moves()
+    if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        king = board.king_square(board.turn)
+        end = king + (2 if san in ('O-O', '0-0') else -2)
+        move = board.move_for(king, end)
+        if move in legal:
+            return move
+        raise ValueError(f"illegal castling {san}")
+
+    promotion = None
+    match = re.search(r'=?([QRBN])$', san)
+    if match:
+        promotion = SAN_PIECES[match.group(1)]
+        san = san[:match.start()]
+    piece_type = SAN_PIECES.get(san[0], 'pawn')
+    body = san[1:] if piece_type != 'pawn' else san
+    body = body.replace('x', '')
+    if len(body) < 2 or body[-2:] not in SQUARE_INDEX:
+        raise ValueError(f"can't read {san}")
+    end, hint = SQUARE_INDEX[body[-2:]], body[:-2]
+
+    for move in legal:
+        start, move_end, move_promotion = unpack_move(move)
+        if move_end != end or move_promotion != promotion or board.squares[start].type != piece_type:
+            continue
+        name = SQUARE_NAMES[start]
+        if all(char in name for char in hint):
+            return move
+    raise ValueError(f"illegal move {san}")
+
+
+def read_pgn(path):
+    """Yields (result, [san, ...]) for every game of a PGN file. Comments, variations and annotations are skipped."""
+    with open(path, encoding='utf-8', errors='replace') as pgn:
+        text = pgn.read()
+    for game in re.split(r'\n\s*\n(?=\[)', text):
+        result = re.search(r'\[Result "([^"]*)"\]', game)
+        moves = re.sub(r'\[[^\]]*\]', ' ', game)
+        moves = re.sub(r'\{[^}]*\}|;[^\n]*', ' ', moves)
+        while '(' in moves:
+            moves = re.sub(r'\([^()]*\)', ' ', moves)
+        tokens = [token for token in re.sub(r'\d+\.(\.\.)?|\$\d+', ' ', moves).split()
+                  if token not in ('1-0', '0-1', '1/2-1/2', '*')]
+        if tokens:
+            yield result.group(1) if result else '*', tokens
+
+
+def build_book(pgn_paths, output, max_ply=24):
+    """Builds a Polyglot book from local PGN files, out of the first max_ply half moves of every game.
+    A move is weighted by how the games it was played in ended for the side that played it."""
+    weights = defaultdict(int)
+    games = 0
+    for path in pgn_paths:
+        for result, sans in read_pgn(path):
+            board = starting_board()
+            points = RESULT_WEIGHTS.get(result, (1, 1))
+            try:
+                for ply, san in enumerate(sans[:max_ply]):
+                    move = parse_san(board, san)
+                    weights[(board.key, encode_move(board, move))] += points[ply % 2]
+                    board.make_move(move)
+                    board.forget_moves()
+            except ValueError:
+                pass  # a broken game still counts up to the move that couldn't be read
+            games += 1
+
+    # Polyglot weights are 16 bits, so big counts get scaled down
+    top = max(weights.values(), default=1)
+    scale = max(1, -(-top // 65535))
+    with open(output, 'wb') as book:
+        for (key, move), weight in sorted(weights.items(), key=lambda item: (item[0][0], -item[1])):
+            book.write(ENTRY.pack(key, move, min(65535, -(-weight // scale)), 0))
+    return games, len(weights)
+
+# Two short games for the round trip check, with a comment, a variation and NAGs that read_pgn has to skip
+CHECK_PGN = """[Event "check"]
+[Result "1-0"]
+
+1. e4 {the usual} e5 (1... c5 2. Nf3) 2. Nf3 $1 Nc6 1-0
+
+[Event "check"]
+[Result "0-1"]
+
+1. e4 c5 2. Nf3 $2 d6 ; sharp
+0-1
+"""
+# What the book has to say afterwards: white's moves count 2 in the won game and 0 in the lost one, black's the other way
+CHECK_BOOK = [("", {'e2e4': 2}), ("e2e4", {'e7e5': 0, 'c7c5': 2}), ("e2e4 e7e5", {'g1f3': 2}),
+              ("e2e4 c7c5", {'g1f3': 0}), ("e2e4 c7c5 g1f3", {'d7d6': 2})]
+
+
+def check_keys():
+    """Compares board.key with the published Polyglot keys, prints a line per position. True if all of them match."""
+    ok = True
+    for name, fen, expected in KNOWN_KEYS:
+        # Once set up from the FEN and once played from the start, so the key updates in make_move get checked too
+        board = starting_board()
+        for san in name.split()[1:] if name.startswith("after") else []:
+            board.make_move(parse_san(board, san))
+        for key in (board_from_fen(fen).key, board.key):
+            print(f"{name:<28} {key:016x} " + ("OK" if key == expected else f"FAIL (expected {expected:016x})"))
+            ok &= key == expected
+    return ok
+
+
+def check_round_trip():
+    """Builds a book from CHECK_PGN and reads it back, prints a line per position. True if every position has the expected moves."""
+    ok = True
+    with tempfile.TemporaryDirectory() as directory:
+        pgn, output = os.path.join(directory, 'check.pgn'), os.path.join(directory, 'check.bin')
+        with open(pgn, 'w', encoding='utf-8') as file:
+            file.write(CHECK_PGN)
+        build_book([pgn], output)
+        with OpeningBook(output) as book:
+            for moves, expected in CHECK_BOOK:
+                board = starting_board()
+                for name in moves.split():
+                    board.make_move(next(move for move in board.legal_moves() if move_name(move) == name))
+                found = {move_name(move): weight for move, weight in book.moves(board)}
+                print(f"book after '{moves}' {found} " + ("OK" if found == expected else f"FAIL (expected {expected})"))
+                ok &= found == expected
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds a Polyglot opening book from PGN files, or looks a position up")
+    parser.add_argument("book", nargs="?", help="book file (.bin)")
+    parser.add_argument("--build", nargs="+", metavar="PGN", help="PGN files to build the book from")
+    parser.add_argument("--plies", type=int, default=24, help="half moves of every game that go into the book")
+    parser.add_argument("--moves", default="", help="moves from the start in long algebraic (e2e4 e7e5) to look up")
+    parser.add_argument("--check", action="store_true", help="check the position keys against the Polyglot ones and build and read back a small book")
+    args = parser.parse_args()
+
+    if args.check:
+        ok = check_keys()
+        ok &= check_round_trip()
+        raise SystemExit(0 if ok else 1)
+    if args.book is None:
+        parser.error("a book file is needed unless --check is given")
+
+    if args.build:
+        games, entries = build_book(args.build, args.book, args.plies)
+        print(f"{games} games, {entries} entries written to {args.book}")
+        return
+
+    board = starting_board()
+    for name in args.moves.split():
+        move = next((move for move in board.legal_moves() if move_name(move) == name), None)
+        if move is None:
+            raise SystemExit(f"illegal move {name}")
+        board.make_move(move)
+    with OpeningBook(args.book) as book:
+        for move, weight in sorted(book.moves(board), key=lambda item: -item[1]):
+            print(f"{move_name(move)} {weight}")
+
+
+if __name__ == "__main__":
+    main()
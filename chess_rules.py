@@ -0,0 +1,452 @@
+from collections import OrderedDict
+
+from bitboard import (Board, SQUARE_INDEX, SQUARE_NAMES, COLOR_INDEX, OPPONENT, PROMOTIONS, CASTLING_RIGHTS, SPECIAL,
+                      KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS, BETWEEN,
+                      rook_attacks, bishop_attacks, queen_attacks, squares_of, material_signature)
+
+# Symbols by (type, colour), the pieces look them up once when they are made
+UNICODE_SYMBOLS = {
+    ('pawn', 'black'): '♙', ('pawn', 'white'): '♟',
+    ('rook', 'black'): '♖', ('rook', 'white'): '♜',
+    ('knight', 'black'): '♘', ('knight', 'white'): '♞',
+    ('bishop', 'black'): '♗', ('bishop', 'white'): '♝',
+    ('queen', 'black'): '♕', ('queen', 'white'): '♛',
+    ('king', 'black'): '♔', ('king', 'white'): '♚',
+}
+
+class Piece:
+    """Main piece class, specific piece classes inherit from this one.
+    There is only one piece object per type and colour (see PIECES), the square it stands on is kept by the board
+    and handed to the methods as a square number (a1 = 0 ... h8 = 63)."""
+    __slots__ = ('type', 'color', 'symbol')
+
+    def __init__(self, type, color):
+        self.type = type
+        self.color = color
+        self.symbol = UNICODE_SYMBOLS[(type, color)]
+
+    def __str__(self):
+        return self.symbol
+
+    def __repr__(self):
+        return f"{self.color} {self.type}"
+
+    # Squares the piece could reach from each square on an empty board
+    reach = [0] * 64
+
+    def attacks(self, index, positions):
+        """Bitboard of the squares this piece attacks from the given square."""
+        return 0
+
+    def generate_moves(self, index, board):
+        """Yields the moves this piece can make from the given square, packed like bitboard.pack_move.
+        Whether the own king ends up in check is left to board.legal_moves."""
+        for target in squares_of(self.attacks(index, board) & ~board.occupied[COLOR_INDEX[self.color]]):
+            yield index | target << 6
+
+    def is_legal_move(self, index, target, positions):
+        """Legal if the piece can reach the target square, nothing stands in between and it isn't taken by a piece of the same colour."""
+        if not self.reach[index] >> target & 1 or positions.occupancy & BETWEEN[index][target]:
+            return False
+        return not positions.occupied[COLOR_INDEX[self.color]] >> target & 1
+
+class Pawn(Piece):
+    __slots__ = ()
+
+    def __init__(self, color):
+        super().__init__('pawn', color)
+
+    def attacks(self, index, positions):
+        return PAWN_ATTACKS[COLOR_INDEX[self.color]][index]
+
+    def generate_moves(self, index, board):
+        color = COLOR_INDEX[self.color]
+        step = 8 if color == 0 else -8
+
+        # Pushes by 1 square, or by 2 squares from the starting row
+        targets = 0
+        if not board.occupancy >> (index + step) & 1:
+            targets |= 1 << (index + step)
+            if index >> 3 == (1 if color == 0 else 6) and not board.occupancy >> (index + 2 * step) & 1:
+                targets |= 1 << (index + 2 * step)
+
+        # Captures, en passant only for the side to move
+        attacks = PAWN_ATTACKS[color][index]
+        targets |= attacks & board.occupied[1 - color]
+        if board.ep_square is not None and board.turn == self.color and attacks >> board.ep_square & 1:
+            yield index | board.ep_square << 6 | SPECIAL
+
+        for target in squares_of(targets):
+            if target >> 3 == 0 or target >> 3 == 7:
+                # Queen, rook, bishop, knight, in the order of PROMOTIONS
+                for code in (1, 2, 3, 4):
+                    yield index | target << 6 | code << 12
+            else:
+                yield index | target << 6
+
+    def is_legal_move(self, index, target, positions):
+        color = COLOR_INDEX[self.color]
+        step = 8 if color == 0 else -8
+
+        # Move by 1 square, or by 2 squares only from the starting row
+        if target == index + step or (target == index + 2 * step and index >> 3 == (1 if color == 0 else 6)):
+            path = 1 << (index + step) | 1 << target
+            return not positions.occupancy & path
+
+        if not PAWN_ATTACKS[color][index] >> target & 1:
+            return False
+
+        # Capture move (excluding en passant)
+        if positions.occupied[1 - color] >> target & 1:
+            return True
+
+        # En passant (latest chess update), only right after the enemy pawn moved two squares
+        return target == positions.ep_square and positions.turn == self.color
+
+class Rook(Piece):
+    __slots__ = ()
+    reach = ROOK_RAYS
+
+    def __init__(self, color):
+        super().__init__('rook', color)
+
+    def attacks(self, index, positions):
+        return rook_attacks(index, positions.occupancy)
+
+
+class Bishop(Piece):
+    __slots__ = ()
+    reach = BISHOP_RAYS
+
+    def __init__(self, color):
+        super().__init__('bishop', color)
+
+    def attacks(self, index, positions):
+        return bishop_attacks(index, positions.occupancy)
+
+
+class Queen(Piece):
+    __slots__ = ()
+    reach = QUEEN_RAYS
+
+    def __init__(self, color):
+        super().__init__('queen', color)
+
+    def attacks(self, index, positions):
+        """Rook and bishop rays combined"""
+        return queen_attacks(index, positions.occupancy)
+
+class King(Piece):
+    __slots__ = ()
+    reach = KING_ATTACKS
+
+    def __init__(self, color):
+        super().__init__('king', color)
+
+    def attacks(self, index, positions):
+        return KING_ATTACKS[index]
+
+    def generate_moves(self, index, board):
+        yield from super().generate_moves(index, board)
+
+        # Castling is generated as the king moving two squares, the enemy attacks are only worked out if needed
+        attacked = None
+        for side in ('o-o', 'o-o-o'):
+            if board.castling & CASTLING_RIGHTS[(self.color, side)]:
+                king_from, king_to, empty_mask, safe_mask = castling_masks[(self.color, side)]
+                if index != king_from or board.occupancy & empty_mask:
+                    continue
+                if attacked is None:
+                    attacked = board.attacked_squares(OPPONENT[self.color])
+                if not attacked & safe_mask:
+                    yield king_from | king_to << 6 | SPECIAL
+
+class Knight(Piece):
+    __slots__ = ()
+    reach = KNIGHT_ATTACKS
+
+    def __init__(self, color):
+        super().__init__('knight', color)
+
+    def attacks(self, index, positions):
+        return KNIGHT_ATTACKS[index]
+
+# The shared piece objects, every board holds these same twelve
+PIECES = {(piece.type, piece.color): piece
+          for piece in (piece_class(color) for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)
+                        for color in ('white', 'black'))}
+# The board looks the promoted piece up here by (type, colour)
+Pawn.promotions = PIECES
+
+def _mask(*squares):
+    return sum(1 << SQUARE_INDEX[square] for square in squares)
+
+# King from, king to, squares that have to be empty, squares that can't be attacked, as square numbers and bitboard
+# masks so the path checks are a single AND. The rook is moved by the board (CASTLING_ROOKS in bitboard.py)
+castling_masks = {
+    ('white', 'o-o'): (SQUARE_INDEX['e1'], SQUARE_INDEX['g1'], _mask('f1', 'g1'), _mask('e1', 'f1', 'g1')),
+    ('white', 'o-o-o'): (SQUARE_INDEX['e1'], SQUARE_INDEX['c1'], _mask('b1', 'c1', 'd1'), _mask('e1', 'd1', 'c1')),
+    ('black', 'o-o'): (SQUARE_INDEX['e8'], SQUARE_INDEX['g8'], _mask('f8', 'g8'), _mask('e8', 'f8', 'g8')),
+    ('black', 'o-o-o'): (SQUARE_INDEX['e8'], SQUARE_INDEX['c8'], _mask('b8', 'c8', 'd8'), _mask('e8', 'd8', 'c8')),
+}
+
+def starting_board():
+    """Piece positions at the start of the game using the shared piece objects, kept on bitboards behind the usual dict interface"""
+    pieces = {}
+    for col, piece_type in enumerate(('rook', 'knight', 'bishop', 'queen', 'king', 'bishop', 'knight', 'rook')):
+        for color, row, pawn_row in (('white', 0, 1), ('black', 7, 6)):
+            pieces[SQUARE_NAMES[row * 8 + col]] = PIECES[(piece_type, color)]
+            pieces[SQUARE_NAMES[pawn_row * 8 + col]] = PIECES[('pawn', color)]
+    return Board(pieces)
+
+def board_from_fen(fen):
+    """Builds a board from a FEN string, used for test positions (perft) rather than the game itself."""
+    piece_types = {'p': 'pawn', 'n': 'knight', 'b': 'bishop', 'r': 'rook', 'q': 'queen', 'k': 'king'}
+    fields = fen.split()
+    pieces = {}
+    for row_index, row in enumerate(fields[0].split('/')):
+        col = 0
+        for char in row:
+            if char.isdigit():
+                col += int(char)
+                continue
+            square = f"{'abcdefgh'[col]}{8 - row_index}"
+            pieces[square] = PIECES[(piece_types[char.lower()], 'white' if char.isupper() else 'black')]
+            col += 1
+    turn = 'white' if len(fields) < 2 or fields[1] == 'w' else 'black'
+    castling = sum({'K': 1, 'Q': 2, 'k': 4, 'q': 8}[char] for char in fields[2] if char != '-') if len(fields) > 2 else 0
+    ep_square = SQUARE_INDEX[fields[3]] if len(fields) > 3 and fields[3] != '-' else None
+    halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+    return Board(pieces, turn, castling, ep_square, halfmove_clock)
+
+class LegalMoveCache:
+    """Legal moves and check status of the last few positions, worked out once per position and kept by its Zobrist key.
+    The key covers everything the moves depend on (pieces, side to move, castling, en passant), so an entry never goes
+    stale, committing a move just moves the lookups on to a new key. The least recently used position is dropped
+    once there are more than size of them."""
+    def __init__(self, size=64):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def lookup(self, board):
+        """(legal moves, side to move in check) of the board's position."""
+        entry = self.entries.get(board.key)
+        if entry is not None:
+            self.entries.move_to_end(board.key)
+            return entry
+        entry = self.entries[board.key] = (board.legal_moves(), board.in_check())
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def legal_moves(self, board):
+        return self.lookup(board)[0]
+
+    def in_check(self, board):
+        return self.lookup(board)[1]
+
+    def clear(self):
+        self.entries.clear()
+
+# Material signatures nobody can mate with: only kings, a single knight, or bishops (any number, on either side)
+# that all stand on one square colour. A single bishop is in there as one of those.
+INSUFFICIENT_MATERIAL = ({material_signature(), material_signature(['knight']), material_signature(black=['knight'])}
+                         | {material_signature([shade] * white, [shade] * black)
+                            for shade in ('light bishop', 'dark bishop') for white in range(11) for black in range(11)})
+
+def insufficient_material(positions):
+    """Nobody can mate anymore, a lookup of the board's material signature."""
+    return positions.material in INSUFFICIENT_MATERIAL
+
+# What game_status can say, the same names Game uses for its result
+GAME_STATUSES = ('checkmate', 'stalemate', 'fifty moves', 'threefold repetition', 'insufficient material', 'ongoing')
+STATUS_MESSAGES = {'stalemate': "It's Stalemate, game over!", 'fifty moves': "Draw by 50 move rule!",
+                   'threefold repetition': "Threefold repetition detected! Game ends in a draw",
+                   'insufficient material': "Insufficient checkmate material, game ends in a draw!"}
+
+def game_status(position):
+    """Is the game over for the side to move, and how. position is a Board or a Game.
+    A Game answers from its LegalMoveCache, the moves are needed for the next turn anyway. A bare board stops
+    the move generation at the first legal move, so an ongoing game costs about one king move check."""
+    board = getattr(position, 'board', position)
+    cache = getattr(position, 'legal', None)
+    if cache is not None:
+        moves, in_check = cache.lookup(board)
+        if not moves:
+            return 'checkmate' if in_check else 'stalemate'
+    elif not board.has_legal_move():
+        return 'checkmate' if board.in_check() else 'stalemate'
+    if board.halfmove_clock >= 100:
+        return 'fifty moves'
+    if board.repetitions() >= 3:
+        return 'threefold repetition'
+    if insufficient_material(board):
+        return 'insufficient material'
+    return 'ongoing'
+
+class Game:
+    """One game of chess with its own board, counters and messages, so any number of games can run side by side.
+    Nothing here ends the program, when the game is over it's written to result (and winner) and the front end decides what to do."""
+    def __init__(self, white_player="anonymous", black_player="anonymous", board=None, tablebases=None):
+        self.board = board if board is not None else starting_board()
+        # Open Tablebases (see tablebase.py), endings they cover are decided on the spot
+        self.tablebases = tablebases
+        # Legal moves and checks of the positions on the board, shared by the move checks, game_status and the UI
+        self.legal = LegalMoveCache()
+        self.players = {'white': white_player, 'black': black_player}
+        self.messages = []
+        self.move_counter = 0
+        self.draw_offers = {'white': False, 'black': False}
+        # None while the game goes on, then 'checkmate', 'stalemate', 'insufficient material',
+        # 'fifty moves', 'threefold repetition', 'agreement' or 'tablebase'
+        self.result = None
+        self.winner = None
+
+    @property
+    def current_color(self):
+        return self.board.turn
+
+    @property
+    def enemy_color(self):
+        return OPPONENT[self.board.turn]
+
+    @property
+    def current_player(self):
+        return self.players[self.current_color]
+
+    @property
+    def is_over(self):
+        return self.result is not None
+
+    def finish(self, result, message, winner=None):
+        """Ends the game, further moves are refused."""
+        self.result = result
+        self.winner = winner
+        self.messages.append(message)
+
+    def threefold_check(self, show_count=False):
+        """Checks the amount of times a position has been reached, the board keeps the Zobrist keys since the last capture or pawn move."""
+        repetitions = self.board.repetitions()
+        if show_count:
+            self.messages.append(f"Threefold draw at : {repetitions}")
+        if repetitions >= 3:
+            self.finish('threefold repetition', "Threefold repetition detected! Game ends in a draw")
+
+    def tablebase_check(self):
+        """Adjudicates the game if the tablebases know the ending, there's no point playing KQK out."""
+        if self.tablebases is None:
+            return
+        found = self.tablebases.probe(self.board)
+        if found is None:
+            return
+        outcome, plies = found
+        if outcome == 'draw':
+            self.finish('tablebase', "Tablebase says it's a draw, game over!")
+        else:
+            winner = self.current_color if outcome == 'win' else self.enemy_color
+            self.finish('tablebase', f"Tablebase says {winner} mates in {(plies + 1) // 2}, {winner} wins!", winner)
+
+    def in_check(self):
+        """Is the side to move in check, from the cache so redrawing the board doesn't work it out again."""
+        return self.legal.in_check(self.board)
+
+    def legal_targets(self, square):
+        """Names of the squares the piece on square can legally go to, from the cached moves of the position."""
+        start = SQUARE_INDEX.get(square)
+        return {SQUARE_NAMES[move >> 6 & 63] for move in self.legal.legal_moves(self.board) if move & 63 == start}
+
+    def checking(self, current_color):
+        """Checks if a move is a check (pun intended), after a legal move of current_color it ends the game
+        if it is over (mate, stalemate or any of the draws). Leaving your own king in check was already refused by move."""
+        positions = self.board
+        status = game_status(self)
+        if status == 'checkmate':
+            self.finish(status, "Checkmate!", current_color)
+        elif status != 'ongoing':
+            message = STATUS_MESSAGES[status]
+            if status == 'insufficient material' and positions.occupancy.bit_count() == 2:
+                message = "Draw by force, only kings remain!"
+            self.finish(status, message)
+        elif self.in_check():
+            self.messages.append(f"Check on {SQUARE_NAMES[positions.king_square(positions.turn)]}")
+
+    def castle(self, choice):
+        """Castles the side to move, choice is 'o-o' or 'o-o-o'. Includes castling with check."""
+        positions, colour = self.board, self.current_color
+        if self.is_over:
+            self.messages.append("The game is over")
+            return False
+        king_from, king_to, _, _ = castling_masks[(colour, choice)]
+        # The right is gone as soon as the king or that rook moved (or the rook got taken)
+        if not positions.castling & CASTLING_RIGHTS[(colour, choice)]:
+            self.messages.append("The king or the rook are not on their default positions")
+            return False
+
+        # The king only generates castling when the path is empty and not attacked, so the cached moves have the answer
+        move = king_from | king_to << 6 | SPECIAL
+        if move not in self.legal.legal_moves(positions):
+            self.messages.append("Castling impossible")
+            return False
+
+        positions.make_move(move)
+        positions.forget_moves()
+        self.move_counter += 1
+
+        if self.in_check():
+            self.messages.append("Roszada z szachem xD")
+        self.checking(colour)
+        return True
+
+    def move(self, move_input, wanted_move, promotion_choice='queen'):
+        """Main function for moving pieces, also checks for the draws, en passant and castling are done by the board.
+        Squares come in as names from the UI ("e2", "e4") and are turned into numbers once, here.
+        Returns True if the move was played."""
+        positions = self.board
+        if self.is_over:
+            self.messages.append("The game is over")
+            return False
+        start, end = SQUARE_INDEX.get(move_input), SQUARE_INDEX.get(wanted_move)
+        piece = positions.squares[start] if start is not None else None
+        if piece is None or end is None or piece.color != self.current_color:
+            self.messages.append("Invalid selection or move!")
+            return False
+
+        promotion = None
+        if piece.type == 'pawn' and end >> 3 in (0, 7):
+            promotion = promotion_choice if promotion_choice in PROMOTIONS else 'queen'
+
+        # The legal moves of the position are worked out once and cached, the piece rules only explain a refusal
+        move = positions.move_for(start, end, promotion)
+        if move not in self.legal.legal_moves(positions):
+            if piece.is_legal_move(start, end, positions):
+                self.messages.append("Illegal move, doesn't block the check" if self.in_check()
+                                     else "Illegal move, your king would be in check")
+            elif positions.occupied[COLOR_INDEX[piece.color]] >> end & 1:
+                self.messages.append("Illegal move, a piece is on the way")
+            else:
+                self.messages.append("Illegal move")
+            return False
+
+        positions.make_move(move)
+        self.checking(piece.color)
+
+        # The move is final now, no need to keep what it takes to undo it
+        positions.forget_moves()
+        self.move_counter += 1
+        if promotion is not None:
+            self.messages.append(f"Pawn promoted to {promotion.capitalize()} at {wanted_move}")
+        # checking already ended the game if it is over, what's left is asking the endgame tables
+        if not self.is_over:
+            self.tablebase_check()
+        return True
+
+    def offer_draw(self):
+        """The side to move offers a draw, the game ends once both sides did."""
+        color = self.current_color
+        if self.is_over or self.draw_offers[color]:
+            return self.is_over
+        self.draw_offers[color] = True
+        self.messages.append(f"{self.current_player.capitalize()} sends a draw offer")
+        if all(self.draw_offers.values()):
+            self.finish('agreement', "Draw by agreement!")
+        return self.is_over
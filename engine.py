@@ -0,0 +1,428 @@
+import argparse
+import time
+
+from bitboard import (PIECE_TYPES, COLOR_INDEX, TYPE_INDEX, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, SPECIAL,
+                      rook_attacks, bishop_attacks, unpack_move, move_name)
+from chess_rules import board_from_fen, INSUFFICIENT_MATERIAL
+from evaluation import evaluate
+from perft import POSITIONS
+from ordering import MoveOrderer
+from tablebase import Tablebases, TABLE_DIR, SIGNATURES
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Centipawns, the king is never taken so it isn't counted
+PIECE_VALUES = {'pawn': 100, 'knight': 320, 'bishop': 330, 'rook': 500, 'queen': 900, 'king': 0}
+MATE = 100000
+INFINITE = MATE + 1
+MAX_DEPTH = 64
+# Same values by type index for the exchange evaluator, where the king has to be worth more than anything
+SEE_VALUES = [PIECE_VALUES[piece_type] for piece_type in PIECE_TYPES[:5]] + [20000]
+# Quiescence skips captures that can't bring the score back near alpha even with this much to spare
+DELTA_MARGIN = 200
+# Every search trick can be switched off on its own, to compare node counts with and without it
+FEATURES = {'pvs': True, 'aspiration': True, 'null_move': True, 'lmr': True, 'check_extension': True, 'futility': True}
+ASPIRATION_WINDOW = 50
+# By remaining depth, how far below alpha the static score has to be for quiet moves to be skipped
+FUTILITY_MARGINS = (0, 200, 500)
+# How many nodes go by between looks at the clock
+CHECK_EVERY = 2048
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out, the last finished depth is used instead."""
+
+
+class SearchResult:
+    """What one search found: the best move, its score from the side to move's view and the line behind it."""
+    def __init__(self, move=None, score=0, depth=0, pv=None, nodes=0, elapsed=0.0):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.pv = pv or []
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def nps(self):
+        return int(self.nodes / max(self.elapsed, 1e-9))
+
+    def __str__(self):
+        if abs(self.score) > MATE - MAX_DEPTH:
+            moves_to_mate = (MATE - abs(self.score) + 1) // 2
+            score = f"mate {moves_to_mate if self.score > 0 else -moves_to_mate}"
+        else:
+            score = f"cp {self.score}"
+        return (f"depth {self.depth} score {score} nodes {self.nodes} nps {self.nps} "
+                f"time {int(self.elapsed * 1000)} pv {' '.join(move_name(move) for move in self.pv)}")
+
+
+def tablebase_score(outcome, plies, ply=0):
+    """A tablebase result as a search score, a mate found in the tables counts like one found by searching."""
+    if outcome == 'draw':
+        return 0
+    return MATE - ply - plies if outcome == 'win' else -MATE + ply + plies
+
+
+def see(board, move):
+    """Static exchange evaluation: material the side to move wins (or loses, if negative) by starting a capture
+    sequence on the target square, with both sides always recapturing with their cheapest piece and allowed
+    to stop whenever going on would lose. Works on the bitboards only, nothing is played on the board.
+    Pieces behind the capturers (a rook behind a rook, a bishop behind a queen) join in when the way clears."""
+    start, end, promotion = unpack_move(move)
+    squares, bitboards = board.squares, board.bitboards
+    mover = squares[start]
+    occupancy = board.occupancy & ~(1 << start)
+    if squares[end] is not None:
+        gain = SEE_VALUES[TYPE_INDEX[squares[end].type]]
+    elif mover.type == 'pawn' and move & SPECIAL:
+        gain = SEE_VALUES[0]
+        occupancy &= ~(1 << (end - 8 if mover.color == 'white' else end + 8))
+    else:
+        gain = 0
+    on_square = SEE_VALUES[TYPE_INDEX[mover.type]]
+    if promotion is not None:
+        on_square = PIECE_VALUES[promotion]
+        gain += on_square - SEE_VALUES[0]
+
+    straight = bitboards[3] | bitboards[4] | bitboards[9] | bitboards[10]
+    diagonal = bitboards[2] | bitboards[4] | bitboards[8] | bitboards[10]
+    attackers = (KNIGHT_ATTACKS[end] & (bitboards[1] | bitboards[7])
+                 | KING_ATTACKS[end] & (bitboards[5] | bitboards[11])
+                 | PAWN_ATTACKS[1][end] & bitboards[0] | PAWN_ATTACKS[0][end] & bitboards[6]
+                 | rook_attacks(end, occupancy) & straight
+                 | bishop_attacks(end, occupancy) & diagonal) & occupancy
+
+    gains = [gain]
+    color = 1 - COLOR_INDEX[mover.color]
+    while True:
+        own = attackers & board.occupied[color]
+        if not own:
+            break
+        for piece_index in range(6):
+            candidates = own & bitboards[color * 6 + piece_index]
+            if candidates:
+                break
+        # The king can only take last, when nothing is left to take it back
+        if piece_index == 5 and attackers & board.occupied[1 - color]:
+            break
+        gains.append(on_square - gains[-1])
+        on_square = SEE_VALUES[piece_index]
+        occupancy &= ~(candidates & -candidates)
+        attackers = (attackers | rook_attacks(end, occupancy) & straight
+                     | bishop_attacks(end, occupancy) & diagonal) & occupancy
+        color = 1 - color
+
+    # Going back, every side only carries on with the exchange if that's better than stopping
+    for index in range(len(gains) - 1, 0, -1):
+        gains[index - 1] = -max(-gains[index - 1], gains[index])
+    return gains[0]
+
+
+class Search:
+    """Negamax alpha-beta with iterative deepening on a board from chess_rules.
+    Keeps the node counter, the clock and the principal variation so they don't have to be passed down every call.
+    The pruning and reduction tricks can be switched off one by one with features, see FEATURES.
+    With tablebases given, positions they cover aren't searched any further, their exact result is used.
+    worker is the number of a Lazy SMP helper (0 for a normal search): odd helpers search every iteration one ply
+    deeper and every helper orders quiet moves a little differently, so they don't all repeat the same work."""
+    def __init__(self, board, time_limit=None, report=None, table=None, features=None, tablebases=None, worker=0):
+        self.board = board
+        self.table = table if table is not None else TranspositionTable()
+        self.tablebases = tablebases
+        self.ordering = MoveOrderer(MAX_DEPTH, seed=worker or None)
+        self.depth_offset = worker % 2
+        self.features = dict(FEATURES, **(features or {}))
+        self.time_limit = time_limit
+        self.report = report
+        self.nodes = 0
+        self.deadline = None
+        self.can_stop = False
+        self.pv = [[] for _ in range(MAX_DEPTH + 1)]
+        self.best_line = []
+        # Anything with is_set(), like a multiprocessing Event, to stop the search from outside
+        self.stop = None
+
+    def check_time(self):
+        if self.can_stop and ((self.deadline is not None and time.perf_counter() > self.deadline)
+                              or (self.stop is not None and self.stop.is_set())):
+            raise SearchTimeout
+
+    def negamax(self, depth, alpha, beta, ply, null_allowed=True):
+        """Score of the position for the side to move, anything outside alpha..beta is only a bound."""
+        board = self.board
+        features = self.features
+        in_check = board.in_check()
+        # Checks are searched one ply deeper, so a quiet looking check sequence isn't cut off at the horizon
+        if in_check and features['check_extension'] and ply < MAX_DEPTH:
+            depth += 1
+        if depth <= 0 or ply >= MAX_DEPTH:
+            return self.quiescence(alpha, beta, ply)
+
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            self.check_time()
+        self.pv[ply] = []
+
+        # Draws by repetition, the fifty move rule and material nobody can mate with, the root itself is always searched
+        if ply and (board.halfmove_clock >= 100 or board.repetitions() >= 2 or board.material in INSUFFICIENT_MATERIAL):
+            return 0
+
+        if ply and self.tablebases is not None and board.material in SIGNATURES:
+            found = self.tablebases.probe(board)
+            if found is not None:
+                return tablebase_score(*found, ply)
+
+        # A result from another iteration or another move order of the same position
+        hash_move = None
+        entry = self.table.probe(board.key)
+        if entry is not None:
+            entry_depth, bound, score, hash_move = entry
+            if ply and entry_depth >= depth:
+                # Mate scores are stored as seen from this position, the path to it may be longer now
+                if score > MATE - MAX_DEPTH:
+                    score -= ply
+                elif score < -MATE + MAX_DEPTH:
+                    score += ply
+                if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                    return score
+
+        pv_node = beta - alpha > 1
+        static = None if in_check else evaluate(board)
+
+        # Null move: if passing still keeps us above beta, a real move will too. Not in check, where passing
+        # is illegal, and not with only pawns left, where having to move can be the whole problem (zugzwang)
+        if (features['null_move'] and null_allowed and ply and not pv_node and not in_check and depth >= 3
+                and static >= beta and abs(beta) < MATE - MAX_DEPTH and board.has_pieces()):
+            reduction = 3 if depth > 6 else 2
+            board.make_null_move()
+            try:
+                score = -self.negamax(depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)
+            finally:
+                board.unmake_null_move()
+            if score >= beta:
+                return beta
+
+        moves = board.legal_moves()
+        if not moves:
+            return -MATE + ply if in_check else 0
+
+        if ply == 0 and self.best_line:
+            # The best move of the last iteration goes first
+            hash_move = self.best_line[0]
+        moves = self.ordering.order(board, moves, hash_move, ply)
+
+        # Futility: close to the horizon and far below alpha, quiet moves can't catch up
+        futile = (features['futility'] and ply and not pv_node and not in_check and depth < len(FUTILITY_MARGINS)
+                  and static + FUTILITY_MARGINS[depth] <= alpha and abs(alpha) < MATE - MAX_DEPTH)
+
+        original_alpha = alpha
+        best_score = -INFINITE
+        best_move = None
+        killers = self.ordering.killers[ply]
+        for index, move in enumerate(moves):
+            quiet = not move >> 12 & 7 and not self.ordering.is_capture(board, move)
+            board.make_move(move)
+            try:
+                gives_check = board.in_check()
+                if futile and index and quiet and not gives_check:
+                    continue
+                new_depth = depth - 1
+                if index == 0:
+                    score = -self.negamax(new_depth, -beta, -alpha, ply + 1)
+                else:
+                    # Late quiet moves are rarely best, they get a shallower look first
+                    reduction = 0
+                    if (features['lmr'] and index >= 3 and depth >= 3 and quiet and not in_check and not gives_check
+                            and move not in killers):
+                        reduction = 2 if index >= 6 and depth >= 6 else 1
+                    # PVS: after the first move, only prove that the others are worse with a zero width window
+                    window = alpha + 1 if features['pvs'] else beta
+                    score = -self.negamax(new_depth - reduction, -window, -alpha, ply + 1)
+                    if reduction and score > alpha:
+                        score = -self.negamax(new_depth, -window, -alpha, ply + 1)
+                    if window != beta and alpha < score < beta:
+                        score = -self.negamax(new_depth, -beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        self.ordering.cutoff(board, move, depth, ply, index)
+                        break
+
+        bound = LOWER if best_score >= beta else EXACT if best_score > original_alpha else UPPER
+        stored = best_score
+        if stored > MATE - MAX_DEPTH:
+            stored += ply
+        elif stored < -MATE + MAX_DEPTH:
+            stored -= ply
+        self.table.store(board.key, depth, bound, stored, best_move if bound != UPPER else None)
+        return best_score
+
+    def search_root(self, depth, last_score):
+        """One iteration. With aspiration windows the search starts in a narrow window around the last score
+        and only widens it when the score falls outside."""
+        if not self.features['aspiration'] or depth < 4 or abs(last_score) >= MATE - MAX_DEPTH:
+            return self.negamax(depth, -INFINITE, INFINITE, 0)
+        window = ASPIRATION_WINDOW
+        alpha, beta = last_score - window, last_score + window
+        while True:
+            score = self.negamax(depth, alpha, beta, 0)
+            if score <= alpha:
+                alpha = max(score - window, -INFINITE)
+            elif score >= beta:
+                beta = min(score + window, INFINITE)
+            else:
+                return score
+            window *= 2
+
+    def quiescence(self, alpha, beta, ply):
+        """Plays out captures and promotions until the position is quiet, so the evaluation isn't taken
+        in the middle of an exchange. The side to move can always stand pat on the static score instead."""
+        board = self.board
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0:
+            self.check_time()
+        self.pv[ply] = []
+
+        stand_pat = evaluate(board)
+        if stand_pat >= beta or ply >= MAX_DEPTH:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        squares = board.squares
+        moves = []
+        for move in board.legal_moves():
+            end = move >> 6 & 63
+            if move >> 12 & 7:
+                moves.append(move)  # promotions
+            elif squares[end] is not None or (move & SPECIAL and squares[move & 63].type == 'pawn'):
+                # Delta pruning, even winning the piece for free wouldn't get close to alpha
+                victim = squares[end].type if squares[end] is not None else 'pawn'
+                if stand_pat + PIECE_VALUES[victim] + DELTA_MARGIN < alpha:
+                    continue
+                # Captures that lose material in the exchange aren't worth looking at
+                if see(board, move) < 0:
+                    continue
+                moves.append(move)
+        moves = self.ordering.order(board, moves, None, ply)
+
+        best_score = stand_pat
+        for move in moves:
+            board.make_move(move)
+            try:
+                score = -self.quiescence(-beta, -alpha, ply + 1)
+            finally:
+                board.unmake_move()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def run(self, depth=None):
+        """Iterative deepening, every depth starts from the line the previous one found.
+        depth is the number of iterations, a helper with a depth offset goes that much deeper on each of them."""
+        start = time.perf_counter()
+        self.table.new_search()
+        self.ordering.new_search()
+        if self.time_limit is not None:
+            self.deadline = start + self.time_limit
+        max_depth = min(depth or MAX_DEPTH, MAX_DEPTH - self.depth_offset)
+        result = SearchResult()
+        # In a tablebase ending the best move is simply looked up
+        found = self.tablebases.best_move(self.board) if self.tablebases is not None else None
+        if found is not None and found[0] is not None:
+            move, outcome, plies = found
+            result = SearchResult(move, tablebase_score(outcome, plies), 1, [move], 1, time.perf_counter() - start)
+            if self.report:
+                self.report(result)
+            return result
+        only_move = len(self.board.legal_moves()) == 1
+        for iteration in range(1, max_depth + 1):
+            current = iteration + self.depth_offset
+            # The first depth always finishes, so there is a move even with a tiny time budget
+            self.can_stop = iteration > 1
+            try:
+                score = self.search_root(current, result.score)
+            except SearchTimeout:
+                break
+            self.best_line = list(self.pv[0])
+            result = SearchResult(self.pv[0][0] if self.pv[0] else None, score, current, list(self.pv[0]),
+                                  self.nodes, time.perf_counter() - start)
+            if self.report:
+                self.report(result)
+            # A mate score won't change with more depth, and a lone legal move needs no thinking
+            if abs(score) > MATE - MAX_DEPTH or only_move:
+                break
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                break
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+
+def search(position, depth=None, time_limit=None, report=None, table=None, features=None, tablebases=None):
+    """Finds the best move for the side to move. Stops at depth, or once time_limit seconds are up,
+    whichever comes first (depth 4 if neither is given). position is a Board or a Game.
+    report is called with a SearchResult after every finished depth.
+    Passing the same TranspositionTable to every search of a game keeps what earlier searches found.
+    features can switch search tricks off, e.g. {'null_move': False}. tablebases is an open Tablebases."""
+    board = getattr(position, 'board', position)
+    if depth is None and time_limit is None:
+        depth = 4
+    return Search(board, time_limit, report, table, features, tablebases).run(depth)
+
+
+def bench(depth, hash_mb=16, features=None):
+    """Fixed depth searches of the perft positions, the total node count is what to compare between settings."""
+    total_nodes, total_time = 0, 0.0
+    for name, fen, _ in POSITIONS:
+        result = Search(board_from_fen(fen), table=TranspositionTable(hash_mb), features=features).run(depth)
+        total_nodes += result.nodes
+        total_time += result.elapsed
+        print(f"{name:<11} depth {depth}: {result.nodes:>9} nodes in {result.elapsed:6.2f}s "
+              f"({result.nps:>7,} nodes/s) bestmove {move_name(result.move)}")
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s ({int(total_nodes / max(total_time, 1e-9)):,} nodes/s)")
+    return total_nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Searches a position and prints the best move")
+    parser.add_argument("--fen", default="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                        help="position to search (default the starting position)")
+    parser.add_argument("--depth", type=int, help="maximum depth")
+    parser.add_argument("--time", type=float, help="time budget in seconds")
+    parser.add_argument("--hash", type=float, default=16, help="transposition table size in MB (default 16)")
+    parser.add_argument("--tablebases", default=TABLE_DIR, help="directory of the endgame tables (see tablebase.py)")
+    parser.add_argument("--disable", nargs="+", default=[], choices=sorted(FEATURES), help="search tricks to switch off")
+    parser.add_argument("--bench", action="store_true",
+                        help="search the perft positions to --depth (default 5) and print the node counts")
+    args = parser.parse_args()
+    features = {name: False for name in args.disable}
+
+    if args.bench:
+        bench(args.depth or 5, args.hash, features)
+        return
+
+    table = TranspositionTable(args.hash)
+    tablebases = Tablebases(args.tablebases)
+    engine = Search(board_from_fen(args.fen), args.time, print, table, features, tablebases or None)
+    result = engine.run(args.depth if args.depth or args.time else 4)
+    stats = engine.ordering.stats()
+    print(f"hashfull {table.hashfull()} hits {table.hits}/{table.probes}")
+    print(f"cutoffs {stats['cutoffs']} first move {stats['first_move_rate']:.1%} "
+          f"average move number {stats['average_index']:.2f}")
+    print(f"bestmove {move_name(result.move) if result.move else '(none)'}")
+
+
+if __name__ == "__main__":
+    main()
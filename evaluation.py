@@ -0,0 +1,134 @@
+# Piece-square tables and material for a tapered evaluation. The board keeps the sums up to date in _put/_remove,
+# so evaluating a position only mixes two numbers instead of going over all the pieces.
+# Tables are written the way the board looks from white's side (a8 first), in centipawns.
+
+PAWN = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    10,  10,  20,  30,  30,  20,  10,  10,
+     5,   5,  10,  25,  25,  10,   5,   5,
+     0,   0,   0,  20,  20,   0,   0,   0,
+     5,  -5, -10,   0,   0, -10,  -5,   5,
+     5,  10,  10, -20, -20,  10,  10,   5,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+PAWN_END = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+    80,  80,  80,  80,  80,  80,  80,  80,
+    50,  50,  50,  50,  50,  50,  50,  50,
+    30,  30,  30,  30,  30,  30,  30,  30,
+    20,  20,  20,  20,  20,  20,  20,  20,
+    10,  10,  10,  10,  10,  10,  10,  10,
+     0,   0,   0,   0,   0,   0,   0,   0,
+     0,   0,   0,   0,   0,   0,   0,   0,
+]
+KNIGHT = [
+   -50, -40, -30, -30, -30, -30, -40, -50,
+   -40, -20,   0,   0,   0,   0, -20, -40,
+   -30,   0,  10,  15,  15,  10,   0, -30,
+   -30,   5,  15,  20,  20,  15,   5, -30,
+   -30,   0,  15,  20,  20,  15,   0, -30,
+   -30,   5,  10,  15,  15,  10,   5, -30,
+   -40, -20,   0,   5,   5,   0, -20, -40,
+   -50, -40, -30, -30, -30, -30, -40, -50,
+]
+BISHOP = [
+   -20, -10, -10, -10, -10, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,  10,  10,   5,   0, -10,
+   -10,   5,   5,  10,  10,   5,   5, -10,
+   -10,   0,  10,  10,  10,  10,   0, -10,
+   -10,  10,  10,  10,  10,  10,  10, -10,
+   -10,   5,   0,   0,   0,   0,   5, -10,
+   -20, -10, -10, -10, -10, -10, -10, -20,
+]
+ROOK = [
+     0,   0,   0,   0,   0,   0,   0,   0,
+     5,  10,  10,  10,  10,  10,  10,   5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+    -5,   0,   0,   0,   0,   0,   0,  -5,
+     0,   0,   0,   5,   5,   0,   0,   0,
+]
+QUEEN = [
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+   -10,   0,   0,   0,   0,   0,   0, -10,
+   -10,   0,   5,   5,   5,   5,   0, -10,
+    -5,   0,   5,   5,   5,   5,   0,  -5,
+     0,   0,   5,   5,   5,   5,   0,  -5,
+   -10,   5,   5,   5,   5,   5,   0, -10,
+   -10,   0,   5,   0,   0,   0,   0, -10,
+   -20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+KING = [
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -30, -40, -40, -50, -50, -40, -40, -30,
+   -20, -30, -30, -40, -40, -30, -30, -20,
+   -10, -20, -20, -20, -20, -20, -20, -10,
+    20,  20,   0,   0,   0,   0,  20,  20,
+    20,  30,  10,   0,   0,  10,  30,  20,
+]
+KING_END = [
+   -50, -40, -30, -20, -20, -30, -40, -50,
+   -30, -20, -10,   0,   0, -10, -20, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  30,  40,  40,  30, -10, -30,
+   -30, -10,  20,  30,  30,  20, -10, -30,
+   -30, -30,   0,   0,   0,   0, -30, -30,
+   -50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+# Same order as bitboard.PIECE_TYPES: pawn, knight, bishop, rook, queen, king
+MIDDLEGAME_VALUES = (82, 337, 365, 477, 1025, 0)
+ENDGAME_VALUES = (94, 281, 297, 512, 936, 0)
+MIDDLEGAME_TABLES = (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+ENDGAME_TABLES = (PAWN_END, KNIGHT, BISHOP, ROOK, QUEEN, KING_END)
+# How much each piece counts towards the middlegame, all of them together make 24
+PHASE_WEIGHTS = (0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+
+
+def _square_scores(values, tables):
+    """Material plus table value for every board piece index (colour * 6 + type) and square number (a1 = 0).
+    Black reads the tables upside down, white reads them with the rows flipped because they are written a8 first."""
+    scores = []
+    for color in range(2):
+        for piece in range(6):
+            scores.append([values[piece] + tables[piece][square ^ 56 if color == 0 else square] for square in range(64)])
+    return scores
+
+
+MIDDLEGAME_SCORES = _square_scores(MIDDLEGAME_VALUES, MIDDLEGAME_TABLES)
+ENDGAME_SCORES = _square_scores(ENDGAME_VALUES, ENDGAME_TABLES)
+PHASE = [PHASE_WEIGHTS[piece % 6] for piece in range(12)]
+
+
+def evaluate(board):
+    """Score from the side to move's point of view, the middlegame and endgame sums the board keeps
+    are mixed by how much material is left."""
+    phase = min(board.phase, MAX_PHASE)
+    middlegame = board.middlegame[0] - board.middlegame[1]
+    endgame = board.endgame[0] - board.endgame[1]
+    score = (middlegame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if board.turn == 'white' else -score
+
+
+def evaluate_from_scratch(board):
+    """Same score added up over all pieces, to check the incremental one against (python perft.py --incremental)."""
+    middlegame, endgame, phase = [0, 0], [0, 0], 0
+    for piece_index, bitboard in enumerate(board.bitboards):
+        square_bits = bitboard
+        while square_bits:
+            square = (square_bits & -square_bits).bit_length() - 1
+            middlegame[piece_index // 6] += MIDDLEGAME_SCORES[piece_index][square]
+            endgame[piece_index // 6] += ENDGAME_SCORES[piece_index][square]
+            phase += PHASE[piece_index]
+            square_bits &= square_bits - 1
+    phase = min(phase, MAX_PHASE)
+    score = ((middlegame[0] - middlegame[1]) * phase + (endgame[0] - endgame[1]) * (MAX_PHASE - phase)) // MAX_PHASE
+    return score if board.turn == 'white' else -score
@@ -0,0 +1,91 @@
+import random
+
+from bitboard import COLOR_INDEX, TYPE_INDEX, SPECIAL
+
+# Sort keys of the move groups, every group is above anything the next one can reach
+HASH_MOVE = 1 << 30
+CAPTURE = 1 << 28
+PROMOTION = 1 << 27
+KILLER = (1 << 26, (1 << 26) - 1)
+HISTORY_LIMIT = 1 << 24
+# Upper bound of the random starting history of a seeded orderer, below the bump of a depth 4 cutoff
+HISTORY_NOISE = 16
+
+
+class MoveOrderer:
+    """Puts the moves most likely to cause a cutoff first: the hash move, then captures by MVV-LVA
+    (most valuable victim, least valuable attacker), then two killer moves per ply, then the rest by history.
+    Also counts how often a cutoff happened and how often it was the first move tried.
+    With a seed the history starts out as a little random noise, so quiet moves nothing is known about yet
+    come in a different order than with another seed (Lazy SMP helpers use that to not all search alike)."""
+    def __init__(self, max_ply=64, seed=None):
+        self.killers = [[None, None] for _ in range(max_ply + 1)]
+        # history[colour][from][to], bumped by depth squared whenever a quiet move causes a cutoff
+        if seed is None:
+            self.history = [[[0] * 64 for _ in range(64)] for _ in range(2)]
+        else:
+            rng = random.Random(seed)
+            self.history = [[[rng.randrange(HISTORY_NOISE) for _ in range(64)] for _ in range(64)] for _ in range(2)]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoff_index_total = 0
+
+    def is_capture(self, board, move):
+        # The only special move of a pawn is taking en passant
+        return (board.squares[move >> 6 & 63] is not None
+                or (move & SPECIAL and board.squares[move & 63].type == 'pawn'))
+
+    def score(self, board, move, hash_move, ply):
+        if move == hash_move:
+            return HASH_MOVE
+        start, end = move & 63, move >> 6 & 63
+        squares = board.squares
+        victim = squares[end]
+        if victim is not None or (move & SPECIAL and squares[start].type == 'pawn'):
+            victim_value = TYPE_INDEX[victim.type] if victim is not None else 0
+            return CAPTURE + victim_value * 8 - TYPE_INDEX[squares[start].type]
+        if move >> 12 & 7 == 1:
+            return PROMOTION  # to a queen
+        killers = self.killers[ply]
+        if move == killers[0]:
+            return KILLER[0]
+        if move == killers[1]:
+            return KILLER[1]
+        return self.history[COLOR_INDEX[board.turn]][start][end]
+
+    def order(self, board, moves, hash_move=None, ply=0):
+        """The moves sorted into a new list, best candidates first."""
+        return sorted(moves, key=lambda move: self.score(board, move, hash_move, ply), reverse=True)
+
+    def cutoff(self, board, move, depth, ply, index):
+        """Called when move (tried as number index) failed high, quiet moves are remembered as killers and in the history."""
+        self.cutoffs += 1
+        self.cutoff_index_total += index
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if self.is_capture(board, move) or move >> 12 & 7:
+            return
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        row = self.history[COLOR_INDEX[board.turn]][move & 63]
+        row[move >> 6 & 63] += depth * depth
+        if row[move >> 6 & 63] > HISTORY_LIMIT:
+            # Halve everything so the history keeps following the current search
+            for row in self.history[0] + self.history[1]:
+                for end in range(64):
+                    row[end] >>= 1
+
+    def new_search(self):
+        """Killers are about positions at a given ply, so they don't carry over to a different root."""
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        self.cutoffs = self.first_move_cutoffs = self.cutoff_index_total = 0
+
+    def stats(self):
+        """Cutoff statistics: how many there were, the share that came from the first move and the average move number."""
+        cutoffs = max(self.cutoffs, 1)
+        return {'cutoffs': self.cutoffs,
+                'first_move_rate': self.first_move_cutoffs / cutoffs,
+                'average_index': self.cutoff_index_total / cutoffs}
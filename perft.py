@@ -0,0 +1,144 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import MATERIAL_KEYS, move_name, squares_of
+from chess_rules import board_from_fen
+from evaluation import evaluate, evaluate_from_scratch
+from transposition import PerftTable
+
+# Standard perft positions with their known node counts, index 0 is depth 1
+POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(board, depth, table=None):
+    """Counts the leaf nodes of the move tree, the last level is only counted, not played.
+    With a PerftTable, subtrees reached again through a different move order are only counted once."""
+    if table is not None and depth > 1:
+        nodes = table.probe(board.key, depth)
+        if nodes is not None:
+            return nodes
+    moves = board.legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.make_move(move)
+        nodes += perft(board, depth - 1, table)
+        board.unmake_move()
+    if table is not None:
+        table.store(board.key, depth, nodes)
+    return nodes
+
+
+def divide(board, depth, table=None):
+    """Node count for each root move, handy for finding which move a generator bug hides under."""
+    counts = {}
+    for move in board.legal_moves():
+        board.make_move(move)
+        counts[move_name(move)] = perft(board, depth - 1, table)
+        board.unmake_move()
+    return counts
+
+
+def _perft_after(fen, move, depth, hash_mb=0):
+    """Worker side of the parallel divide, every process builds its own board (and table) from the FEN."""
+    board = board_from_fen(fen)
+    board.make_move(move)
+    return move_name(move), perft(board, depth - 1, PerftTable(hash_mb) if hash_mb else None)
+
+
+def parallel_divide(fen, depth, workers=None, hash_mb=0):
+    """Same as divide, but the root moves are spread over a process pool."""
+    moves = board_from_fen(fen).legal_moves()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_perft_after, [fen] * len(moves), moves, [depth] * len(moves), [hash_mb] * len(moves))
+        return dict(results)
+
+
+def run(fen, depth, workers=0, show_divide=False, hash_mb=0):
+    """Runs perft on a position and returns the node count and the time it took."""
+    start = time.perf_counter()
+    if workers:
+        counts = parallel_divide(fen, depth, workers, hash_mb)
+    else:
+        counts = divide(board_from_fen(fen), depth, PerftTable(hash_mb) if hash_mb else None)
+    elapsed = time.perf_counter() - start
+    if show_divide:
+        for name, nodes in sorted(counts.items()):
+            print(f"{name}: {nodes}")
+    return sum(counts.values()), elapsed
+
+
+def check_incremental(board, depth):
+    """Walks the tree like perft and compares what make_move keeps up to date (the evaluation sums and the material
+    signature) with the same values added up from scratch. Returns the number of positions where they differ."""
+    material = sum(MATERIAL_KEYS[piece_index][square]
+                   for piece_index, bitboard in enumerate(board.bitboards) for square in squares_of(bitboard))
+    wrong = int(evaluate(board) != evaluate_from_scratch(board) or board.material != material)
+    if depth == 0:
+        return wrong
+    for move in board.legal_moves():
+        board.make_move(move)
+        wrong += check_incremental(board, depth - 1)
+        board.unmake_move()
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft benchmark and move generator regression check")
+    parser.add_argument("--fen", help="position to run instead of the bundled suite")
+    parser.add_argument("--depth", type=int, default=3, help="search depth (default 3)")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    parser.add_argument("--workers", type=int, default=0, help="spread root moves over this many processes")
+    parser.add_argument("--hash", type=float, default=0, help="MB of hash table for counted subtrees (default off)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="check the incremental evaluation and material signature against a recount instead")
+    args = parser.parse_args()
+
+    if args.incremental:
+        failed = 0
+        for name, fen, _ in [("fen", args.fen, None)] if args.fen else POSITIONS:
+            wrong = check_incremental(board_from_fen(fen), args.depth)
+            failed += wrong
+            print(f"{name:<11} depth {args.depth}: " + ("OK" if not wrong else f"FAIL ({wrong} positions differ)"))
+        if failed:
+            raise SystemExit(f"{failed} position(s) with a wrong incremental value")
+        return
+
+    if args.fen:
+        nodes, elapsed = run(args.fen, args.depth, args.workers, args.divide, args.hash)
+        print(f"depth {args.depth}: {nodes} nodes in {elapsed:.2f}s ({nodes / max(elapsed, 1e-9):,.0f} nodes/s)")
+        return
+
+    failed = 0
+    total_nodes, total_time = 0, 0.0
+    for name, fen, expected in POSITIONS:
+        depth = min(args.depth, len(expected))
+        nodes, elapsed = run(fen, depth, args.workers, args.divide, args.hash)
+        total_nodes += nodes
+        total_time += elapsed
+        result = "OK" if nodes == expected[depth - 1] else f"FAIL (expected {expected[depth - 1]})"
+        failed += nodes != expected[depth - 1]
+        print(f"{name:<11} depth {depth}: {nodes:>9} nodes in {elapsed:6.2f}s "
+              f"({nodes / max(elapsed, 1e-9):>9,.0f} nodes/s) {result}")
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s ({total_nodes / max(total_time, 1e-9):,.0f} nodes/s)")
+    if failed:
+        raise SystemExit(f"{failed} position(s) gave wrong node counts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import multiprocessing
+import os
+import queue
+from multiprocessing import shared_memory
+
+from bitboard import move_name
+from chess_rules import board_from_fen
+from engine import Search
+from transposition import TranspositionTable, table_bytes
+
+
+def _helper(shm_name, megabytes, board, depth, time_limit, worker, stop, results):
+    """Helper process: searches the same root as the main process with its own board, filling the shared table.
+    Every odd helper is one ply deeper than the main process on each iteration, and every helper orders quiet moves
+    from its own seeded history (see Search), so they look at different parts of the tree first."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    table = TranspositionTable(megabytes, shm.buf)
+    try:
+        engine = Search(board, time_limit, table=table, worker=worker)
+        engine.stop = stop
+        result = engine.run(depth)
+        results.put((worker, result))
+    finally:
+        table.release()
+        shm.close()
+
+
+def search(position, depth=None, time_limit=None, workers=None, megabytes=64, report=None):
+    """Lazy SMP: the main process and workers - 1 helper processes search the same position at the same time,
+    sharing one transposition table in shared memory, so what one of them finds the others can cut on.
+    Returns the result of whichever process got the deepest (the main process on a tie)."""
+    board = getattr(position, 'board', position)
+    if depth is None and time_limit is None:
+        depth = 4
+    workers = workers or os.cpu_count() or 1
+
+    shm = shared_memory.SharedMemory(create=True, size=table_bytes(megabytes))
+    table = TranspositionTable(megabytes, shm.buf)
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    helpers = [multiprocessing.Process(target=_helper, daemon=True,
+                                       args=(shm.name, megabytes, board, depth, time_limit, worker, stop, results))
+               for worker in range(1, workers)]
+    try:
+        for helper in helpers:
+            helper.start()
+        engine = Search(board, time_limit, report, table)
+        best = engine.run(depth)
+        # The main process decides when the search is over, the helpers hand in what they finished
+        stop.set()
+        for _ in helpers:
+            try:
+                _, result = results.get(timeout=30)
+            except queue.Empty:
+                break  # a helper died, the ones left get terminated below
+            if result.depth > best.depth and result.move is not None:
+                best.move, best.score, best.depth, best.pv = result.move, result.score, result.depth, result.pv
+            best.nodes += result.nodes
+        for helper in helpers:
+            helper.join(timeout=5)
+        return best
+    finally:
+        stop.set()
+        for helper in helpers:
+            if helper.is_alive():
+                helper.terminate()
+        table.release()
+        shm.close()
+        shm.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process (Lazy SMP) search of a position")
+    parser.add_argument("--fen", default="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+                        help="position to search (default the starting position)")
+    parser.add_argument("--depth", type=int, help="maximum depth")
+    parser.add_argument("--time", type=float, help="time budget in seconds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to search with (default all cores)")
+    parser.add_argument("--hash", type=float, default=64, help="shared transposition table size in MB (default 64)")
+    args = parser.parse_args()
+
+    result = search(board_from_fen(args.fen), args.depth, args.time, args.workers, args.hash, report=print)
+    print(f"best line (depth {result.depth}, {result.nodes} nodes over all processes): "
+          f"{' '.join(move_name(move) for move in result.pv)}")
+    print(f"bestmove {move_name(result.move) if result.move else '(none)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import argparse
+import itertools
+import mmap
+import os
+import time
+
+from bitboard import (COLOR_INDEX, COLORS, PIECE_TYPES, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS,
+                      rook_attacks, bishop_attacks, queen_attacks, squares_of, material_signature, move_name)
+from chess_rules import board_from_fen
+
+# Endings with a table, always written with white as the side that has the pieces (in PIECE_TYPES order)
+TABLES = {'KQK': ('queen',), 'KRK': ('rook',), 'KPK': ('pawn',), 'KBNK': ('knight', 'bishop')}
+# Material signature (see bitboard.py) of every ending with a table: which table and which colour has the pieces
+SIGNATURES = {}
+for _name, _pieces in TABLES.items():
+    for _names in itertools.product(*[('light bishop', 'dark bishop') if piece == 'bishop' else (piece,) for piece in _pieces]):
+        SIGNATURES[material_signature(_names)] = (_pieces, 0)
+        SIGNATURES[material_signature(black=_names)] = (_pieces, 1)
+# The pawn table needs the queen and rook tables for its promotions, so they are built first
+BUILD_ORDER = ('KQK', 'KRK', 'KPK', 'KBNK')
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+
+# One byte per position: 0 is a draw, ILLEGAL a position that can't happen, anything else is the number of half moves
+# to mate plus one. Odd means the side to move gets mated, even means it mates.
+ILLEGAL = 255
+
+# Without pawns the board can be turned and mirrored, so the white king only needs the 10 squares of the a1-d1-d4 triangle
+_SYMMETRIES = [lambda col, row: (col, row), lambda col, row: (7 - col, row), lambda col, row: (col, 7 - row),
+               lambda col, row: (7 - col, 7 - row), lambda col, row: (row, col), lambda col, row: (7 - row, col),
+               lambda col, row: (row, 7 - col), lambda col, row: (7 - row, 7 - col)]
+TRANSFORMS = [[symmetry(square & 7, square >> 3)[0] + 8 * symmetry(square & 7, square >> 3)[1] for square in range(64)]
+              for symmetry in _SYMMETRIES]
+TRIANGLE = [square for square in range(64) if (square & 7) <= 3 and (square >> 3) <= (square & 7)]
+TRIANGLE_INDEX = {square: index for index, square in enumerate(TRIANGLE)}
+# Which transform brings the white king into the triangle, identity for the triangle itself
+KING_SYMMETRY = [next(number for number, transform in enumerate(TRANSFORMS) if transform[square] in TRIANGLE_INDEX)
+                 for square in range(64)]
+TRANSPOSE = TRANSFORMS[4]
+
+
+class Layout:
+    """Where a position of one table sits in its array. The white to move half comes first, then the black to move one."""
+    def __init__(self, name):
+        self.name = name
+        self.pieces = TABLES[name]
+        self.pawn = self.pieces == ('pawn',)
+        self.size = 64 * 48 * 64 if self.pawn else len(TRIANGLE) * 64 ** (len(self.pieces) + 1)
+
+    def index(self, white_king, squares, black_king):
+        if self.pawn:
+            return (white_king * 48 + squares[0] - 8) * 64 + black_king
+        transform = TRANSFORMS[KING_SYMMETRY[white_king]]
+        index = TRIANGLE_INDEX[transform[white_king]]
+        for square in squares:
+            index = index * 64 + transform[square]
+        return index * 64 + transform[black_king]
+
+    def decode(self, index):
+        index, black_king = divmod(index, 64)
+        if self.pawn:
+            white_king, pawn = divmod(index, 48)
+            return white_king, (pawn + 8,), black_king
+        squares = []
+        for _ in self.pieces:
+            index, square = divmod(index, 64)
+            squares.append(square)
+        return TRIANGLE[index], tuple(reversed(squares)), black_king
+
+    def twins(self, white_king, squares, black_king):
+        """Indexes of a position and, when the white king stands on the diagonal, of its mirror image over it.
+        Both are kept in the table, so both have to get the same value."""
+        yield self.index(white_king, squares, black_king)
+        if self.pawn:
+            return
+        transform = TRANSFORMS[KING_SYMMETRY[white_king]]
+        king = transform[white_king]
+        if king & 7 == king >> 3:
+            yield self.index(king, tuple(TRANSPOSE[transform[square]] for square in squares),
+                             TRANSPOSE[transform[black_king]])
+
+
+def _white_attacks(pieces, white_king, squares, occupancy):
+    attacks = KING_ATTACKS[white_king]
+    for piece_type, square in zip(pieces, squares):
+        if piece_type == 'knight':
+            attacks |= KNIGHT_ATTACKS[square]
+        elif piece_type == 'bishop':
+            attacks |= bishop_attacks(square, occupancy)
+        elif piece_type == 'rook':
+            attacks |= rook_attacks(square, occupancy)
+        elif piece_type == 'queen':
+            attacks |= queen_attacks(square, occupancy)
+        else:
+            attacks |= PAWN_ATTACKS[0][square]
+    return attacks
+
+
+def _reverse_moves(piece_type, square, occupancy):
+    """Squares a white piece standing on square could have come from, with the board as it is now."""
+    if piece_type == 'knight':
+        return KNIGHT_ATTACKS[square] & ~occupancy
+    if piece_type == 'bishop':
+        return bishop_attacks(square, occupancy) & ~occupancy
+    if piece_type == 'rook':
+        return rook_attacks(square, occupancy) & ~occupancy
+    if piece_type == 'queen':
+        return queen_attacks(square, occupancy) & ~occupancy
+    # Pawns go back one square, or two from the fourth row, never onto the first row
+    origins = 0
+    if square >= 16 and not occupancy >> (square - 8) & 1:
+        origins |= 1 << (square - 8)
+        if square >> 3 == 3 and not occupancy >> (square - 16) & 1:
+            origins |= 1 << (square - 16)
+    return origins
+
+
+def generate(name, tables=None, log=None):
+    """Retrograde analysis of one ending. Starts from the mates and walks the move graph backwards:
+    a white position is won as soon as one move reaches a lost black position, a black position is lost once
+    every king move leads to a won white position. Whatever is left at the end is a draw.
+    tables has to hold the already generated queen and rook tables for the pawn ending.
+    Returns the white to move and black to move halves as bytearrays."""
+    layout = Layout(name)
+    pieces, size = layout.pieces, layout.size
+    white, black = bytearray(size), bytearray(size)
+    # Black moves not yet known to lose, a black position is lost when this runs out
+    moves_left = bytearray(size)
+    levels = {}
+
+    # Every position once: legality, the black king's moves and the mates
+    for index in range(size):
+        white_king, squares, black_king = layout.decode(index)
+        occupied = 1 << white_king | 1 << black_king
+        for square in squares:
+            occupied |= 1 << square
+        if occupied.bit_count() != len(squares) + 2 or KING_ATTACKS[white_king] >> black_king & 1:
+            white[index] = black[index] = ILLEGAL
+            continue
+        attacks = _white_attacks(pieces, white_king, squares, occupied & ~(1 << black_king))
+        in_check = attacks >> black_king & 1
+        if in_check:
+            white[index] = ILLEGAL  # black can't have left its king in check
+        # Taking an undefended piece counts as a move too, it leaves the table into a draw and is never used up
+        count = (KING_ATTACKS[black_king] & ~attacks).bit_count()
+        moves_left[index] = count
+        if not count and in_check:
+            black[index] = 1
+            levels.setdefault(0, []).append((1, index))
+
+    if layout.pawn:
+        # Promotions leave the table, their value comes from the queen and rook tables
+        for index in range(size):
+            white_king, (pawn,), black_king = layout.decode(index)
+            if pawn < 48 or white[index] == ILLEGAL or (1 << white_king | 1 << black_king) >> (pawn + 8) & 1:
+                continue
+            best = 0
+            for promoted in ('KQK', 'KRK'):
+                promoted_layout, (_, promoted_black) = Layout(promoted), tables[promoted]
+                value = promoted_black[promoted_layout.index(white_king, (pawn + 8,), black_king)]
+                if value != ILLEGAL and value & 1 and (not best or value + 1 < best):
+                    best = value + 1
+            if best:
+                white[index] = best
+                levels.setdefault(best - 1, []).append((0, index))
+
+    plies = 0
+    while levels:
+        entries = levels.pop(plies, [])
+        found = 0
+        for side, index in entries:
+            white_king, squares, black_king = layout.decode(index)
+            occupied = 1 << white_king | 1 << black_king
+            for square in squares:
+                occupied |= 1 << square
+            if side == 1:
+                # Lost black position: every white move into it wins for white
+                for number, (piece_type, square) in enumerate(zip(pieces, squares)):
+                    for origin in squares_of(_reverse_moves(piece_type, square, occupied)):
+                        before = squares[:number] + (origin,) + squares[number + 1:]
+                        before_occupied = occupied & ~(1 << square) | 1 << origin
+                        if _white_attacks(pieces, white_king, before, before_occupied & ~(1 << black_king)) >> black_king & 1:
+                            continue
+                        found += _mark_white(layout, white, levels, plies, white_king, before, black_king)
+                for origin in squares_of(KING_ATTACKS[white_king] & ~occupied & ~KING_ATTACKS[black_king]):
+                    before_occupied = occupied & ~(1 << white_king) | 1 << origin
+                    if _white_attacks(pieces, origin, squares, before_occupied & ~(1 << black_king)) >> black_king & 1:
+                        continue
+                    found += _mark_white(layout, white, levels, plies, origin, squares, black_king)
+            else:
+                if white[index] != plies + 1:
+                    continue  # found a faster win later on, this entry is stale
+                # Won white position: the black king move into it is one less way out for black
+                for origin in squares_of(KING_ATTACKS[black_king] & ~occupied & ~KING_ATTACKS[white_king]):
+                    # The mirror image of this one is queued as well and takes care of the mirrored black position
+                    before = layout.index(white_king, squares, origin)
+                    if black[before] or not moves_left[before]:
+                        continue
+                    moves_left[before] -= 1
+                    if not moves_left[before]:
+                        black[before] = plies + 2
+                        levels.setdefault(plies + 1, []).append((1, before))
+                        found += 1
+        if log and entries:
+            log(f"{name}: {plies} plies, {len(entries)} positions, {found} new")
+        plies += 1
+
+    return white, black
+
+
+def _mark_white(layout, white, levels, plies, white_king, squares, black_king):
+    """White to move wins in plies + 1, unless a faster win is already known."""
+    marked = 0
+    for index in layout.twins(white_king, squares, black_king):
+        value = white[index]
+        if value == ILLEGAL or (value and value <= plies + 2):
+            continue
+        white[index] = plies + 2
+        levels.setdefault(plies + 1, []).append((0, index))
+        marked += 1
+    return marked
+
+
+def build(names=BUILD_ORDER, directory=TABLE_DIR, log=print):
+    """Generates the tables and writes them to directory as NAME.tb, one byte per position."""
+    os.makedirs(directory, exist_ok=True)
+    tables = {}
+    for name in BUILD_ORDER:
+        if name not in names and not (name in ('KQK', 'KRK') and 'KPK' in names):
+            continue
+        path = os.path.join(directory, f"{name}.tb")
+        if os.path.exists(path) and name not in names:
+            with open(path, 'rb') as file:
+                data = file.read()
+            tables[name] = (bytearray(data[:len(data) // 2]), bytearray(data[len(data) // 2:]))
+            continue
+        start = time.perf_counter()
+        tables[name] = generate(name, tables, log)
+        with open(path, 'wb') as file:
+            file.write(tables[name][0])
+            file.write(tables[name][1])
+        if log:
+            log(f"{name}: written to {path} in {time.perf_counter() - start:.1f}s")
+    return tables
+
+
+class Tablebases:
+    """Memory mapped tables from a directory, whatever of them was generated. Probing reads one byte."""
+    def __init__(self, directory=TABLE_DIR):
+        self.tables = {}
+        self.files = []
+        for name, pieces in TABLES.items():
+            path = os.path.join(directory, f"{name}.tb")
+            if os.path.exists(path) and os.path.getsize(path):
+                file = open(path, 'rb')
+                self.files.append(file)
+                self.tables[pieces] = (Layout(name), mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self):
+        return len(self.tables)
+
+    def close(self):
+        for _, data in self.tables.values():
+            data.close()
+        for file in self.files:
+            file.close()
+        self.tables = {}
+
+    def probe(self, board):
+        """Outcome for the side to move as ('win' | 'loss' | 'draw', half moves to mate),
+        None if there is no table for the position."""
+        ending = SIGNATURES.get(board.material)
+        if ending is None or board.castling:
+            return None
+        pieces, strong = ending
+        table = self.tables.get(pieces)
+        if table is None:
+            return None
+        layout, data = table
+        bitboards = board.bitboards
+        # Black with the pieces is looked up as white with the board upside down
+        flip = 56 * strong
+        squares = tuple(bitboards[strong * 6 + PIECE_TYPES.index(piece_type)].bit_length() - 1 ^ flip
+                        for piece_type in layout.pieces)
+        white_king = board.king_square(COLORS[strong]) ^ flip
+        black_king = board.king_square(COLORS[1 - strong]) ^ flip
+        index = layout.index(white_king, squares, black_king)
+        value = data[index if COLOR_INDEX[board.turn] == strong else layout.size + index]
+        if value == ILLEGAL:
+            return None
+        if not value:
+            return 'draw', 0
+        return ('loss' if value & 1 else 'win'), value - 1
+
+    def best_move(self, board):
+        """The move that mates fastest, holds the draw, or loses slowest, with the outcome it keeps.
+        None if the position has no table."""
+        found = self.probe(board)
+        if found is None:
+            return None
+        best, best_rank = None, None
+        for move in board.legal_moves():
+            board.make_move(move)
+            try:
+                if not board.legal_moves():
+                    after = ('loss', 0) if board.in_check() else ('draw', 0)
+                else:
+                    # Anything that leaves the tables here (a capture, a minor piece promotion) is a draw
+                    after = self.probe(board) or ('draw', 0)
+            finally:
+                board.unmake_move()
+            outcome, plies = after
+            rank = (-1000 + plies) if outcome == 'loss' else 0 if outcome == 'draw' else 1000 - plies
+            if best_rank is None or rank < best_rank:
+                best, best_rank = move, rank
+        outcome, plies = found
+        return best, outcome, plies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds or probes the endgame tablebases (KQK, KRK, KPK, KBNK)")
+    parser.add_argument("--build", nargs="*", choices=BUILD_ORDER, help="tables to generate (all if none given)")
+    parser.add_argument("--dir", default=TABLE_DIR, help="where the tables live")
+    parser.add_argument("--probe", metavar="FEN", help="position to look up")
+    args = parser.parse_args()
+
+    if args.build is not None:
+        build(args.build or BUILD_ORDER, args.dir)
+    if args.probe:
+        tablebases = Tablebases(args.dir)
+        board = board_from_fen(args.probe)
+        found = tablebases.best_move(board)
+        if found is None:
+            print("no table for this position")
+        else:
+            move, outcome, plies = found
+            print(f"{outcome} in {plies} plies, best move {move_name(move) if move else '(none)'}")
+        tablebases.close()
+
+
+if __name__ == "__main__":
+    main()
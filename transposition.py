@@ -0,0 +1,109 @@
+from array import array
+
+# Bound types, EXACT is a real score, LOWER came from a beta cutoff, UPPER from a node where nothing beat alpha
+EXACT, LOWER, UPPER = 1, 2, 3
+# 8 bytes of key and 8 bytes of data per entry
+ENTRY_SIZE = 16
+SCORE_OFFSET = 1 << 20
+
+
+def _entries_for(megabytes, per_bucket=1):
+    """Biggest power of two of entries (whole buckets) that fits in the budget."""
+    entries = max(per_bucket, int(megabytes * 1024 * 1024) // ENTRY_SIZE)
+    return 1 << (entries.bit_length() - 1)
+
+
+def table_bytes(megabytes):
+    """Size of the buffer a TranspositionTable of this budget needs, for putting one in shared memory."""
+    return _entries_for(megabytes, 2) * ENTRY_SIZE
+
+
+class TranspositionTable:
+    """Fixed size hash table of search results, kept in one preallocated buffer seen as two arrays of 64 bit numbers
+    (keys and data) instead of a dict.
+    Every bucket has two entries, the first one keeps the deepest result (or the one from the current search),
+    the second one is always overwritten. The data word is move (16 bits, packed by the board) | score (21) | depth (8) | bound (2) | age (8),
+    and the stored key is XORed with it, so an entry only matches if both halves belong together.
+    By default the table owns its memory, but any writable buffer of table_bytes(megabytes) can be given instead
+    (like a multiprocessing shared memory block), then several processes fill the same table. Thanks to the XOR
+    a half written entry from another process just doesn't match, so no locking is needed."""
+    def __init__(self, megabytes=16, buffer=None):
+        self.size = _entries_for(megabytes, 2)
+        self.mask = self.size // 2 - 1
+        self.buffer = buffer if buffer is not None else bytearray(ENTRY_SIZE * self.size)
+        view = memoryview(self.buffer)
+        self.keys = view[:8 * self.size].cast('Q')
+        self.data = view[8 * self.size:ENTRY_SIZE * self.size].cast('Q')
+        self.age = 0
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self.buffer[:ENTRY_SIZE * self.size] = bytes(ENTRY_SIZE * self.size)
+        self.age = 0
+
+    def release(self):
+        """Lets go of the views on the buffer, a shared memory block can't be closed while they exist."""
+        self.keys.release()
+        self.data.release()
+
+    def new_search(self):
+        """Entries from earlier searches are still used, but get replaced before anything from this one."""
+        self.age = (self.age + 1) & 255
+        self.probes = self.hits = 0
+
+    def probe(self, key):
+        """Returns (depth, bound, score, move) stored for a position, or None."""
+        self.probes += 1
+        index = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        for slot in (index, index + 1):
+            entry = data[slot]
+            if entry and keys[slot] ^ entry == key:
+                self.hits += 1
+                return (entry >> 37 & 255, entry >> 45 & 3, (entry >> 16 & 0x1FFFFF) - SCORE_OFFSET,
+                        entry & 0xFFFF or None)
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        index = (key & self.mask) << 1
+        keys, data = self.keys, self.data
+        entry = data[index]
+        # The depth preferred slot is only given up for a deeper result, the same position or an old search
+        if entry and keys[index] ^ entry != key and entry >> 47 == self.age and entry >> 37 & 255 > depth:
+            index += 1
+        elif entry and keys[index] ^ entry == key and not move:
+            # Keep the best move of an earlier search of this position if this one didn't find any
+            move = entry & 0xFFFF
+        entry = ((move or 0) | (score + SCORE_OFFSET) << 16 | min(depth, 255) << 37 | bound << 45
+                 | self.age << 47)
+        keys[index] = key ^ entry
+        data[index] = entry
+
+    def hashfull(self):
+        """Permille of the first thousand entries used by the current search, like the UCI hashfull."""
+        sample = min(1000, self.size)
+        return sum(1 for entry in self.data[:sample] if entry and entry >> 47 == self.age) * 1000 // sample
+
+
+class PerftTable:
+    """Node counts of already counted subtrees, same layout as the transposition table with one always replaced entry
+    per position. The data word is count << 8 | depth, so a count is only reused for the same depth."""
+    def __init__(self, megabytes=16):
+        self.size = _entries_for(megabytes)
+        self.mask = self.size - 1
+        self.keys = array('Q', bytes(8 * self.size))
+        self.data = array('Q', bytes(8 * self.size))
+
+    def probe(self, key, depth):
+        index = key & self.mask
+        entry = self.data[index]
+        if entry and entry & 255 == depth and self.keys[index] ^ entry == key:
+            return entry >> 8
+        return None
+
+    def store(self, key, depth, count):
+        index = key & self.mask
+        entry = count << 8 | depth
+        self.keys[index] = key ^ entry
+        self.data[index] = entry